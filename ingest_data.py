@@ -1,25 +1,82 @@
 import pandas as pd
 import sqlite3
 import os
+from typing import Optional
 
 # --- Configuration ---
 CSV_FILE_PATH = 'data/Mobile_Food_Facility_Permit_20250504.csv'
 DATABASE_FILE_PATH = 'data/foodtrucks.db'
 TABLE_NAME = 'food_facilities'
 
+# Rows are streamed from the CSV and inserted in batches of this size so the
+# whole file never has to be resident in memory at once.
+CHUNK_SIZE = 50_000
+
+# The CSV columns we keep (original header names) with explicit dtypes, so the
+# parser neither runs two-pass type inference nor materializes columns we drop.
+# Latitude/Longitude are left out on purpose: they are coerced with
+# pd.to_numeric(errors='coerce') below so malformed coordinates drop the row
+# instead of aborting the whole load. Nullable Int64 covers integer columns
+# with missing values.
+CSV_DTYPES = {
+    'locationid': 'int64',
+    'Applicant': 'string',
+    'FacilityType': 'string',
+    'cnn': 'string',
+    'LocationDescription': 'string',
+    'Address': 'string',
+    'blocklot': 'string',
+    'block': 'string',
+    'lot': 'string',
+    'permit': 'string',
+    'Status': 'string',
+    'FoodItems': 'string',
+    'X': 'float64',
+    'Y': 'float64',
+    'Schedule': 'string',
+    'dayshours': 'string',
+    'NOISent': 'string',
+    'Approved': 'string',
+    'Received': 'string',
+    'PriorPermit': 'Int64',
+    'ExpirationDate': 'string',
+    'Location': 'string',
+    'Fire Prevention Districts': 'Int64',
+    'Police Districts': 'Int64',
+    'Supervisor Districts': 'Int64',
+    'Zip Codes': 'Int64',
+    'Neighborhoods (old)': 'Int64',
+}
+CSV_COLUMNS = list(CSV_DTYPES) + ['Latitude', 'Longitude']
+
+
+def _sanitize_column_name(name: str) -> str:
+    """Turns a CSV header into a valid SQLite identifier (e.g. 'Zip Codes' -> 'Zip_Codes')."""
+    return name.strip().replace(' ', '_').replace('(', '').replace(')', '')
+
+
 # --- Data Ingestion Script ---
-def create_database_and_table(db_path: str):
-    """Creates the SQLite database file and the food_facilities table."""
-    conn = None
-    try:
-        # Ensure the directory for the database file exists
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+def create_database_and_table(db_path: str = DATABASE_FILE_PATH, conn: Optional[sqlite3.Connection] = None):
+    """Creates the SQLite database file and the food_facilities table.
+    Drops any existing table first so each ingest is a clean load.
 
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+    When an already-open connection is passed (e.g. an in-memory database in
+    tests), the schema is created on it directly and the connection is left
+    open for the caller; otherwise the file at db_path is opened and closed
+    here as before."""
+    owns_conn = conn is None
+    try:
+        if owns_conn:
+            # Ensure the directory for the database file exists
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            conn = sqlite3.connect(db_path)
 
+        # One multi-statement script: executescript runs the whole DDL inside
+        # the SQLite parser with a single Python-to-C transition
         create_table_sql = f"""
-        CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+        DROP TABLE IF EXISTS {TABLE_NAME};
+        DROP TABLE IF EXISTS {TABLE_NAME}_fts;
+        CREATE TABLE {TABLE_NAME} (
             locationid INTEGER PRIMARY KEY,
             Applicant TEXT,
             FacilityType TEXT,
@@ -27,7 +84,7 @@ def create_database_and_table(db_path: str):
             LocationDescription TEXT,
             Address TEXT,
             blocklot TEXT,
-            block TEXT, 
+            block TEXT,
             lot TEXT,
             permit TEXT,
             Status TEXT,
@@ -48,80 +105,152 @@ def create_database_and_table(db_path: str):
             Police_Districts INTEGER,
             Supervisor_Districts INTEGER,
             Zip_Codes INTEGER,
-            Neighborhoods_old TEXT
+            Neighborhoods_old TEXT,
+
+            -- Lower-cased shadow columns so case-insensitive lookups can hit
+            -- an index instead of evaluating LOWER() per row in a full scan
+            Applicant_lc TEXT GENERATED ALWAYS AS (lower(Applicant)) STORED,
+            Address_lc TEXT GENERATED ALWAYS AS (lower(Address)) STORED,
+            Status_lc TEXT GENERATED ALWAYS AS (lower(Status)) STORED
         );
         """
-        cursor.execute(create_table_sql) # Create the table if it doesn't exist
+        conn.executescript(create_table_sql)
         conn.commit()
-        print(f"Database '{db_path}' and table '{TABLE_NAME}' ensured to exist.")
+        print(f"Table '{TABLE_NAME}' ensured to exist.")
 
     except sqlite3.Error as e:
         print(f"Database error during table creation: {e}")
     finally:
-        if conn:
+        if owns_conn and conn:
             conn.close()
 
-def ingest_csv_data(csv_path: str, db_path: str, table_name: str):
-    """Reads data from CSV and inserts it into the SQLite table."""
+
+def create_indexes(conn: sqlite3.Connection):
+    """Creates the indexes after the bulk load.
+
+    Building B-trees over already-loaded data is much cheaper than updating
+    them row by row during the insert, so this runs once at the end of the
+    ingest. ANALYZE records table/index statistics for the query planner.
+
+    The statements run as one executescript call: the whole batch is parsed
+    and executed inside SQLite without a Python round-trip per statement."""
+    # Indexes over the generated columns (the composite one covers the
+    # status + location filter used by the nearest search), then the
+    # full-text index over the searched text columns. The external-content
+    # FTS form shares storage with the main table and 'rebuild' populates
+    # the inverted index from it in one pass.
+    conn.executescript(f"""
+        CREATE INDEX idx_applicant_lc ON {TABLE_NAME}(Applicant_lc);
+        CREATE INDEX idx_address_lc ON {TABLE_NAME}(Address_lc);
+        CREATE INDEX idx_status_latlon ON {TABLE_NAME}(Status_lc, Latitude, Longitude);
+        CREATE VIRTUAL TABLE {TABLE_NAME}_fts USING fts5(
+            Applicant, Address, content='{TABLE_NAME}', content_rowid='locationid', tokenize='unicode61');
+        INSERT INTO {TABLE_NAME}_fts({TABLE_NAME}_fts) VALUES('rebuild');
+        ANALYZE;
+    """)
+    conn.commit()
+
+def ingest_csv_data(csv_path: str, db_path: str = DATABASE_FILE_PATH, table_name: str = TABLE_NAME,
+                    conn: Optional[sqlite3.Connection] = None):
+    """Streams data from CSV in chunks and bulk-inserts it into the SQLite table.
+
+    As with create_database_and_table, callers may pass an open connection
+    (in-memory test databases) instead of a file path; borrowed connections
+    are left open and have their transaction mode restored afterwards."""
     if not os.path.exists(csv_path):
         print(f"Error: CSV file not found at {csv_path}")
         print("Please download the data from the SFGov link and place it in the 'data/' directory.")
         return
 
     print(f"Reading data from {csv_path}...")
+    owns_conn = conn is None
     try:
-        df = pd.read_csv(csv_path, low_memory=False) # low_memory=False to avoid dtype warning
-        print(f"Successfully read {len(df)} rows from CSV.")
+        if owns_conn:
+            print(f"Connecting to database '{db_path}'...")
+            conn = sqlite3.connect(db_path)
 
-        # --- Data Cleaning and Preparation ---
-        df['Latitude'] = pd.to_numeric(df['Latitude'], errors='coerce') # Convert to numeric, coerce errors to NaN
-        df['Longitude'] = pd.to_numeric(df['Longitude'], errors='coerce')
+        # Load-time PRAGMAs: durability is not needed while rebuilding a
+        # throwaway table, so skip fsync and keep the journal in memory.
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA journal_mode=MEMORY")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA locking_mode=EXCLUSIVE")
 
-        # Drop rows where Latitude or Longitude are NaN
-        initial_rows = len(df)
-        df.dropna(subset=['Latitude', 'Longitude'], inplace=True)
-        rows_dropped = initial_rows - len(df)
-        if rows_dropped > 0:
-            print(f"Dropped {rows_dropped} rows with missing Latitude or Longitude.")
+        # Manage the transaction explicitly: autocommit semantics would break
+        # the load into many small transactions, each paying journal overhead.
+        conn.isolation_level = None
+        conn.execute("BEGIN IMMEDIATE")
 
-        # Rename columns to be valid SQLite identifiers 
-        df.columns = [c.strip().replace(' ', '_') for c in df.columns]
+        total_rows = 0
+        total_dropped = 0
+        insert_sql = None
 
-        # Based on previous errors, explicitly convert 'cnn' and 'Received' to string
-        if 'cnn' in df.columns:
-             df['cnn'] = df['cnn'].astype(str)
-        if 'Received' in df.columns:
-             df['Received'] = df['Received'].astype(str)
+        # Stream the CSV in chunks instead of loading it all at once; each
+        # chunk is bulk-inserted via executemany (parameter binding happens in
+        # C) inside the single load transaction.
+        for chunk in pd.read_csv(csv_path, chunksize=CHUNK_SIZE, usecols=CSV_COLUMNS, dtype=CSV_DTYPES):
+            # --- Data Cleaning and Preparation ---
+            chunk['Latitude'] = pd.to_numeric(chunk['Latitude'], errors='coerce') # Convert to numeric, coerce errors to NaN
+            chunk['Longitude'] = pd.to_numeric(chunk['Longitude'], errors='coerce')
 
+            # Drop rows where Latitude or Longitude are NaN
+            initial_rows = len(chunk)
+            chunk.dropna(subset=['Latitude', 'Longitude'], inplace=True)
+            total_dropped += initial_rows - len(chunk)
 
-        print(f"Connecting to database '{db_path}'...")
-        conn = sqlite3.connect(db_path)
+            # Rename columns to valid SQLite identifiers matching the table schema
+            chunk.columns = [_sanitize_column_name(c) for c in chunk.columns]
 
-        # Use pandas to_sql to insert data
-        print(f"Inserting data into table '{table_name}'...")
+            # NaN -> None so SQLite stores NULL, and numpy scalars -> plain
+            # Python objects that sqlite3 can bind directly.
+            chunk = chunk.astype(object).where(chunk.notna(), None)
 
-        # if_exists='replace' will drop the table and recreate it each time, clean load for the assessment
-        df.to_sql(table_name, conn, if_exists='replace', index=False) # index=False to avoid writing DataFrame index as a column
+            # The column set is identical for every chunk, so the INSERT text
+            # is built once and reused (sqlite3 caches the prepared statement
+            # by its exact text)
+            if insert_sql is None:
+                columns = list(chunk.columns)
+                placeholders = ",".join("?" * len(columns))
+                insert_sql = f"INSERT INTO {table_name} ({','.join(columns)}) VALUES ({placeholders})"
 
-        conn.commit()
-        print(f"Successfully inserted {len(df)} rows into '{table_name}'.")
+            # itertuples yields plain tuples lazily; executemany consumes the
+            # iterator directly with parameter binding done in C
+            conn.executemany(insert_sql, chunk.itertuples(index=False, name=None))
+            total_rows += len(chunk)
+
+        conn.execute("COMMIT")
+
+        if total_dropped > 0:
+            print(f"Dropped {total_dropped} rows with missing Latitude or Longitude.")
+        print(f"Successfully inserted {total_rows} rows into '{table_name}'.")
+
+        # Indexes are created only now, after all rows are in place
+        create_indexes(conn)
+
+        # Restore durable settings for the serving process: the load-time
+        # PRAGMAs trade safety for speed and must not outlive the load.
+        conn.execute("PRAGMA locking_mode=NORMAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
 
-    except FileNotFoundError:
-        print(f"Error: CSV file not found at {csv_path}")
     except pd.errors.EmptyDataError:
         print(f"Error: CSV file is empty at {csv_path}")
     except Exception as e:
         print(f"An error occurred during data ingestion: {e}")
+        if conn is not None and conn.in_transaction:
+            conn.execute("ROLLBACK")
     finally:
         if conn:
-            conn.close()
+            if owns_conn:
+                conn.close()
+            else:
+                # Hand the borrowed connection back in default autocommit mode
+                conn.isolation_level = ""
 
 
 if __name__ == "__main__":
-    # Ensure the data directory exists
-    os.makedirs('data', exist_ok=True)
-
     # Create the database file and table structure
+    # (create_database_and_table ensures the data directory exists)
     create_database_and_table(DATABASE_FILE_PATH)
 
     # Ingest data from the CSV file into the database
@@ -1,21 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from pydantic import TypeAdapter
 from typing import List, Optional
 import sqlite3
 
 from src.core.database import get_db
 from src.services.foodtruck_service import FoodFacilityService
 from src.data_access.foodtruck_repository import FoodFacilityRepository
-from src.models.schemas import FoodFacility, FoodFacilityWithDistance
+from src.models.schemas import FoodFacility, FoodFacilityBase, FoodFacilityWithDistance
 
-# These functions are used to provide dependencies to the FastAPI routes.
-def get_food_facility_repository(db: sqlite3.Connection = Depends(get_db)) -> FoodFacilityRepository:
-    """Provides a FoodFacilityRepository instance with a database connection."""
-    return FoodFacilityRepository(db=db)
+# Cached adapter: serializes a whole list of facilities to JSON bytes in one
+# pydantic-core call instead of FastAPI dumping each model individually.
+_FACILITY_LIST_ADAPTER = TypeAdapter(List[FoodFacilityBase])
 
-def get_food_facility_service(
-    repository: FoodFacilityRepository = Depends(get_food_facility_repository)) -> FoodFacilityService:
-    """Provides a FoodFacilityService instance with a repository."""
-    return FoodFacilityService(repository=repository)
+# This function is used to provide dependencies to the FastAPI routes.
+# A single provider keeps the Depends graph one node deep: only the pooled
+# connection (get_db) is resolved as a sub-dependency per request, which also
+# keeps the test-time get_db override working. Service and repository hold no
+# state beyond that connection, so constructing them is two plain allocations.
+def get_food_facility_service(db: sqlite3.Connection = Depends(get_db)) -> FoodFacilityService:
+    """Provides a FoodFacilityService bound to the request's database connection."""
+    return FoodFacilityService(repository=FoodFacilityRepository(db=db))
 
 
 # --- API Router ---
@@ -36,7 +40,8 @@ def search_by_name(
     Returns a list of matching food facilities.
     """
     results = service.search_by_name(applicant_name=q, status=status) # status is optional
-    return results # returns [] if no results found
+    # Returning a Response bypasses FastAPI's second serialization pass
+    return Response(content=_FACILITY_LIST_ADAPTER.dump_json(results), media_type="application/json")
 
 @router.get("/search/street", response_model=List[FoodFacility])
 def search_by_street(
@@ -48,7 +53,7 @@ def search_by_street(
     Returns a list of matching food facilities.
     """
     results = service.search_by_street(street_name=q)
-    return results # returns [] if no results found
+    return Response(content=_FACILITY_LIST_ADAPTER.dump_json(results), media_type="application/json")
 
 @router.get("/nearest", response_model=List[FoodFacilityWithDistance])
 def find_nearest(
@@ -0,0 +1,148 @@
+import sqlite3
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from src.core.config import DATABASE_URL
+from src.utils.geo import calculate_distance_batch
+
+# Key used in the per-status index dict when no status filter applies
+_ALL_STATUSES = "__all__"
+
+
+class SpatialIndex(NamedTuple):
+    """Static spatial index over one status slice of the facilities table.
+
+    xyz holds precomputed unit-sphere (x, y, z) vectors: the dot product with
+    the query's unit vector is the cosine of the central angle, so ranking by
+    dot product is ranking by great-circle distance — one fused multiply-add
+    per point (a single BLAS matvec for the whole slice) and no
+    transcendentals until the final top-k distances are reported.
+    """
+    location_ids: np.ndarray  # (N,) int64
+    lats: np.ndarray          # (N,) float64, degrees
+    lons: np.ndarray          # (N,) float64, degrees
+    xyz: np.ndarray           # (N, 3) float64, C-contiguous unit vectors
+
+
+# The dataset is loaded once from CSV and read-only while serving, so the
+# location arrays are read from SQLite exactly once at startup and every
+# status slice is derived from them in memory. None is memoized for statuses
+# with no facilities so they are not rebuilt on every request.
+_all_location_ids: Optional[np.ndarray] = None
+_all_lats: Optional[np.ndarray] = None
+_all_lons: Optional[np.ndarray] = None
+_all_statuses: Optional[np.ndarray] = None  # lower-cased status per row
+_indexes: Dict[str, Optional[SpatialIndex]] = {}
+_lock = threading.Lock()
+_warmed = False
+
+
+def _to_unit_xyz(lats_deg: np.ndarray, lons_deg: np.ndarray) -> np.ndarray:
+    """Projects (lat, lon) in degrees onto 3-D unit-sphere coordinates."""
+    lats = np.radians(np.asarray(lats_deg, dtype=np.float64))
+    lons = np.radians(np.asarray(lons_deg, dtype=np.float64))
+    cos_lats = np.cos(lats)
+    return np.column_stack((cos_lats * np.cos(lons), cos_lats * np.sin(lons), np.sin(lats)))
+
+
+def _build_index(status: Optional[str]) -> Optional[SpatialIndex]:
+    """Builds the index for one status slice from the cached arrays; None if empty."""
+    if status:
+        mask = _all_statuses == status.lower()
+        location_ids = _all_location_ids[mask]
+        lats = _all_lats[mask]
+        lons = _all_lons[mask]
+    else:
+        location_ids, lats, lons = _all_location_ids, _all_lats, _all_lons
+
+    if len(location_ids) == 0:
+        return None
+    xyz = np.ascontiguousarray(_to_unit_xyz(lats, lons))
+    return SpatialIndex(location_ids, lats, lons, xyz)
+
+
+def warm() -> None:
+    """
+    Loads the location arrays from SQLite once at application startup and
+    builds the spatial index for the default status ('APPROVED'). Quietly
+    stays cold when the database is missing or empty (e.g. under tests, where
+    get_db is overridden and the service falls back to per-request scans).
+    """
+    global _all_location_ids, _all_lats, _all_lons, _all_statuses, _warmed
+    db_path = DATABASE_URL.replace("sqlite:///", "")
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            rows = conn.execute(
+                "SELECT locationid, Latitude, Longitude, Status_lc FROM food_facilities "
+                "WHERE Latitude IS NOT NULL AND Longitude IS NOT NULL"
+            ).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Could not warm spatial index cache: {e}")
+        return
+
+    if not rows:
+        return
+
+    with _lock:
+        _all_location_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        _all_lats = np.array([row[1] for row in rows], dtype=np.float64)
+        _all_lons = np.array([row[2] for row in rows], dtype=np.float64)
+        _all_statuses = np.array([row[3] for row in rows], dtype=object)
+        _indexes["approved"] = _build_index("approved")
+        _warmed = True
+
+
+def clear() -> None:
+    """Drops all cached arrays and indexes (used when the data is reloaded)."""
+    global _all_location_ids, _all_lats, _all_lons, _all_statuses, _warmed
+    with _lock:
+        _all_location_ids = _all_lats = _all_lons = _all_statuses = None
+        _indexes.clear()
+        _warmed = False
+
+
+def get_index(status: Optional[str]) -> Optional[SpatialIndex]:
+    """
+    Returns the spatial index for a status, slicing the cached arrays lazily
+    for statuses not seen before. Returns None while the cache is cold.
+    """
+    if not _warmed:
+        return None
+    key = status.lower() if status else _ALL_STATUSES
+    if key in _indexes:
+        return _indexes[key]
+
+    with _lock:
+        if key not in _indexes:
+            _indexes[key] = _build_index(status)
+        return _indexes[key]
+
+
+def query_nearest(index: SpatialIndex, lat: float, lon: float, k: int) -> List[Tuple[int, float]]:
+    """
+    Queries the k nearest facilities to (lat, lon) against a spatial index.
+
+    Returns a list of (locationid, distance_km) pairs sorted by distance.
+    """
+    k = min(k, len(index.location_ids))
+    target = _to_unit_xyz(np.array([lat]), np.array([lon]))[0]
+
+    # One matvec ranks every point: higher cosine = closer along the great circle
+    scores = index.xyz @ target
+    if k < scores.shape[0]:
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(scores.shape[0])
+
+    # Only the k winners get a real distance computation, which also keeps the
+    # reported numbers identical to the brute-force haversine path
+    distances_km = calculate_distance_batch(lat, lon, index.lats[idx], index.lons[idx])
+    order = np.argsort(distances_km)
+    idx = idx[order]
+    distances_km = distances_km[order]
+    return [(int(index.location_ids[i]), float(d)) for i, d in zip(idx, distances_km)]
@@ -1,8 +1,74 @@
+import re
 import sqlite3
 from typing import List, Optional, Tuple
 
 from src.models.schemas import FoodFacilityBase 
 
+# Explicit select list derived from the schema. SELECT * would also
+# materialize the generated *_lc columns (and any future DB-only columns)
+# for every row, only for Pydantic to throw them away.
+_SCHEMA_COLUMNS = ", ".join(FoodFacilityBase.model_fields)
+
+# Same list qualified with the main-table alias, for queries that join the FTS table
+_QUALIFIED_SCHEMA_COLUMNS = ", ".join(f"f.{column}" for column in FoodFacilityBase.model_fields)
+
+# SQL text built once at import. sqlite3 keys its prepared-statement cache on
+# the exact statement text, so passing the same constant on every call means
+# each statement is parsed and planned once per connection instead of per
+# request. Variants that differ only by the status filter are spelled out so
+# both shapes stay cacheable.
+_STATUS_FILTER = " AND Status_lc = ?"
+
+_SQL_ALL_WITH_LOCATION = (
+    f"SELECT {_SCHEMA_COLUMNS} FROM food_facilities"
+    " WHERE Latitude IS NOT NULL AND Longitude IS NOT NULL"
+)
+_SQL_FTS_SEARCH = (
+    f"SELECT {_QUALIFIED_SCHEMA_COLUMNS} FROM food_facilities f"
+    " JOIN food_facilities_fts x ON f.locationid = x.rowid"
+    " WHERE food_facilities_fts MATCH ?"
+)
+_SQL_LIKE_APPLICANT = f"SELECT {_SCHEMA_COLUMNS} FROM food_facilities WHERE Applicant_lc LIKE ?"
+_SQL_LIKE_ADDRESS = f"SELECT {_SCHEMA_COLUMNS} FROM food_facilities WHERE Address_lc LIKE ?"
+_SQL_BY_STATUS = _SQL_ALL_WITH_LOCATION + _STATUS_FILTER
+_SQL_CANDIDATES = (
+    "SELECT locationid, Latitude, Longitude FROM food_facilities"
+    " WHERE Latitude IS NOT NULL AND Longitude IS NOT NULL"
+)
+_SQL_CANDIDATES_BBOX = (
+    "SELECT locationid, Latitude, Longitude FROM food_facilities"
+    " WHERE Latitude BETWEEN ? AND ? AND Longitude BETWEEN ? AND ?"
+)
+
+
+def _like_pattern(query_text: str) -> str:
+    """Canonicalizes a search string into its %-wrapped lowercase LIKE pattern."""
+    return f"%{query_text.lower()}%"
+
+
+def _rows_to_models(rows: List[sqlite3.Row]) -> List[FoodFacilityBase]:
+    """
+    Converts raw rows into models with model_construct, skipping Pydantic
+    validation. Safe here: every row comes from our own table through the
+    explicit select list above, so the keys and types are already exactly
+    what the schema declares. This drops the per-row validation pass that
+    dominates large search responses.
+    """
+    return [FoodFacilityBase.model_construct(**dict(row)) for row in rows]
+
+
+def _build_fts_match(query_text: str, column: str) -> Optional[str]:
+    """
+    Builds an FTS5 prefix-match expression scoped to one column, e.g.
+    'Curry Up' -> 'Applicant : ("curry"* "up"*)'. Returns None when the
+    query contains no searchable tokens.
+    """
+    tokens = re.findall(r"[^\W_]+", query_text.lower())
+    if not tokens:
+        return None
+    terms = " ".join(f'"{token}"*' for token in tokens)
+    return f"{column} : ({terms})"
+
 class FoodFacilityRepository:
     """
     Repository class for accessing Food Facility data from the SQLite database.
@@ -22,8 +88,6 @@ class FoodFacilityRepository:
         """Helper method to execute a read query and fetch all results."""
         cursor = self.db.cursor()
         try:
-            db_path = self.db.execute("PRAGMA database_list;").fetchone()[2]
-
             cursor.execute(query, params or [])
             rows = cursor.fetchall()
             return rows
@@ -32,42 +96,134 @@ class FoodFacilityRepository:
             print(f"Database query error: {e}")
             return [] # Return empty list on query error
 
+    def _execute_probe(self, query: str, params: Optional[list] = None) -> List[Tuple]:
+        """
+        Like _execute_query but returns plain tuples: the probe queries for
+        the nearest search only read columns by position, so building a
+        sqlite3.Row (with its by-name lookup table) per candidate is wasted
+        work on the hottest per-request loop.
+        """
+        cursor = self.db.cursor()
+        cursor.row_factory = None
+        try:
+            cursor.execute(query, params or [])
+            return cursor.fetchall()
+
+        except sqlite3.Error as e:
+            print(f"Database query error: {e}")
+            return []
+
     def get_all_facilities(self) -> List[FoodFacilityBase]:
         """Fetches all food facilities from the database."""
-        query = "SELECT * FROM food_facilities WHERE Latitude IS NOT NULL AND Longitude IS NOT NULL"
-        rows = self._execute_query(query)
+        rows = self._execute_query(_SQL_ALL_WITH_LOCATION)
         # Convert raw rows to Pydantic models representing the data structure
-        return [FoodFacilityBase(**row) for row in rows]
-
-    def search_by_applicant_name(self, name_query: str, status: Optional[str] = None) -> List[FoodFacilityBase]:
-        """Searches facilities by applicant name (partial, case-insensitive)."""
-        query = "SELECT * FROM food_facilities WHERE LOWER(Applicant) LIKE ?"
-        params = [f"%{name_query.lower()}%"]
+        return _rows_to_models(rows)
 
+    def _search_fts(self, column: str, query_text: str, status: Optional[str] = None) -> List[sqlite3.Row]:
+        """Searches one text column through the FTS5 inverted index (token-prefix match)."""
+        match = _build_fts_match(query_text, column)
+        if match is None:
+            return []
+        query = _SQL_FTS_SEARCH
+        params = [match]
         if status:
-            query += " AND LOWER(Status) = ?"
+            query += " AND f.Status_lc = ?"
             params.append(status.lower())
+        return self._execute_query(query, params)
+
+    def search_by_applicant_name(self, name_query: str, status: Optional[str] = None) -> List[FoodFacilityBase]:
+        """Searches facilities by applicant name (partial, case-insensitive).
+
+        The FTS5 index answers token-prefix queries without scanning the
+        table; LIKE remains as a fallback for explicit wildcards and for
+        mid-word substrings that token matching cannot see.
+        """
+        rows: List[sqlite3.Row] = []
+        if "%" not in name_query and "_" not in name_query:
+            rows = self._search_fts("Applicant", name_query, status=status)
+
+        if not rows:
+            query = _SQL_LIKE_APPLICANT
+            params = [_like_pattern(name_query)]
 
-        rows = self._execute_query(query, params)
-        return [FoodFacilityBase(**row) for row in rows]
+            if status:
+                query += _STATUS_FILTER
+                params.append(status.lower())
+
+            rows = self._execute_query(query, params)
+        return _rows_to_models(rows)
 
     def search_by_street_name(self, street_query: str) -> List[FoodFacilityBase]:
-        """Searches facilities by street name (partial, case-insensitive)."""
-        query = "SELECT * FROM food_facilities WHERE LOWER(Address) LIKE ?"
-        params = [f"%{street_query.lower()}%"]
+        """Searches facilities by street name (partial, case-insensitive).
+
+        Uses the FTS5 index with the same LIKE fallback as the name search.
+        """
+        rows: List[sqlite3.Row] = []
+        if "%" not in street_query and "_" not in street_query:
+            rows = self._search_fts("Address", street_query)
 
-        rows = self._execute_query(query, params)
-        return [FoodFacilityBase(**row) for row in rows]
+        if not rows:
+            rows = self._execute_query(_SQL_LIKE_ADDRESS, [_like_pattern(street_query)])
+        return _rows_to_models(rows)
 
     def get_facilities_by_status(self, status: str) -> List[FoodFacilityBase]:
         """Fetches facilities filtered by a specific status (case-insensitive)."""
-        query = "SELECT * FROM food_facilities WHERE LOWER(Status) = ? AND Latitude IS NOT NULL AND Longitude IS NOT NULL"
-        params = [status.lower()]
-        rows = self._execute_query(query, params)
-        return [FoodFacilityBase(**row) for row in rows]
+        rows = self._execute_query(_SQL_BY_STATUS, [status.lower()])
+        return _rows_to_models(rows)
 
     def get_all_facilities_with_location(self) -> List[FoodFacilityBase]:
         """Fetches all facilities that have valid Latitude and Longitude."""
-        query = "SELECT * FROM food_facilities WHERE Latitude IS NOT NULL AND Longitude IS NOT NULL"
-        rows = self._execute_query(query)
-        return [FoodFacilityBase(**row) for row in rows]
+        rows = self._execute_query(_SQL_ALL_WITH_LOCATION)
+        return _rows_to_models(rows)
+
+    def get_candidate_locations(self, status: Optional[str] = None) -> List[Tuple[int, float, float]]:
+        """
+        Fetches only (locationid, Latitude, Longitude) for facilities with a
+        valid location, optionally filtered by status.
+
+        This is the narrow "probe" query for the nearest search: distance is
+        computed over these triples and full rows are hydrated afterwards for
+        just the top results.
+        """
+        query = _SQL_CANDIDATES
+        params = []
+        if status:
+            query += _STATUS_FILTER
+            params.append(status.lower())
+        return self._execute_probe(query, params)
+
+    def get_candidates_in_bbox(
+        self,
+        lat_min: float,
+        lat_max: float,
+        lon_min: float,
+        lon_max: float,
+        status: Optional[str] = None,
+    ) -> List[Tuple[int, float, float]]:
+        """
+        Narrow probe restricted to a lat/lon bounding box.
+
+        With a status filter this is a single range scan over the
+        (Status_lc, Latitude, Longitude) composite index, so only rows near
+        the reference point ever reach Python. The service grows the box
+        until it holds enough candidates.
+        """
+        query = _SQL_CANDIDATES_BBOX
+        params: list = [lat_min, lat_max, lon_min, lon_max]
+        if status:
+            query += _STATUS_FILTER
+            params.append(status.lower())
+        return self._execute_probe(query, params)
+
+    def get_rows_by_ids(self, location_ids: List[int]) -> List[sqlite3.Row]:
+        """Fetches full facility rows for the given locationids in one query.
+
+        Returns raw rows: the nearest search constructs its response models
+        itself, so validating an intermediate FoodFacilityBase per row here
+        would be pure overhead.
+        """
+        if not location_ids:
+            return []
+        placeholders = ",".join("?" * len(location_ids))
+        query = f"SELECT {_SCHEMA_COLUMNS} FROM food_facilities WHERE locationid IN ({placeholders})"
+        return self._execute_query(query, list(location_ids))
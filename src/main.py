@@ -1,10 +1,12 @@
 from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
+from fastapi.responses import ORJSONResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 import os
 
 # Import the API router for food trucks
 from src.api import foodtrucks
+from src.core import cache
+from src.utils import geo_fast
 
 # --- FastAPI Application Instance ---
 app = FastAPI(
@@ -12,9 +14,19 @@ app = FastAPI(
     description="API for searching and finding nearest mobile food facilities in San Francisco",
     version="1.0.0", # Version for the API docs
     docs_url="/docs", # Explicitly set docs URL
-    redoc_url="/redoc" # Explicitly set redoc URL
+    redoc_url="/redoc", # Explicitly set redoc URL
+    default_response_class=ORJSONResponse # Rust-based JSON encoder, several times faster than stdlib json
 )
 
+# --- Startup Hooks ---
+@app.on_event("startup")
+def warm_caches():
+    """Builds the spatial index once at startup; the dataset is read-only while serving."""
+    cache.warm()
+    # Compile the numba distance kernel (if numba is installed) before traffic arrives
+    geo_fast.warmup()
+
+
 # --- Include API Routers ---
 # Include the foodtrucks router in the main application
 app.include_router(foodtrucks.router)
@@ -1,8 +1,12 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional, List, Union # union is used for type hinting multiple types
 
 class FoodFacilityBase(BaseModel):
     """Base schema for a food facility."""
+    # from_attributes lets the model be built straight from row-like objects,
+    # extra='ignore' drops DB-only columns (e.g. the generated *_lc ones)
+    model_config = ConfigDict(from_attributes=True, extra='ignore', populate_by_name=True)
+
     locationid: int
     Applicant: str
     FacilityType: Optional[str] = None
@@ -1,10 +1,22 @@
 
+import math
 from typing import List, Optional
 
+import numpy as np
+
+from src.core import cache
 from src.models.schemas import FoodFacility, FoodFacilityWithDistance
-from src.utils.geo import calculate_distance
+from src.utils.geo_fast import haversine_distances
 from src.data_access.foodtruck_repository import FoodFacilityRepository
 
+# Bounding-box search for the nearest fallback path: start with a ~5 km
+# half-width and double until enough candidates land inside the box. Past the
+# cap (~110 km) the dataset is effectively unclustered and a full probe is
+# cheaper than more range scans.
+_BBOX_INITIAL_DELTA_DEG = 0.045
+_BBOX_MAX_DELTA_DEG = 1.0
+
+
 class FoodFacilityService:
     """Handles business logic for Food Facilities.
     Uses a FoodFacilityRepository to access data.
@@ -27,10 +39,9 @@ class FoodFacilityService:
         Returns:
             A list of FoodFacility objects.
         """
-        facilities_base = self.repository.search_by_applicant_name(applicant_name, status)
-
-        # Convert to FoodFacility schema, we have the same structure
-        return [FoodFacility(**f.model_dump()) for f in facilities_base] 
+        # FoodFacility adds no fields over FoodFacilityBase, so the rows are
+        # returned as-is instead of a model_dump + re-validate round-trip per row
+        return self.repository.search_by_applicant_name(applicant_name, status)
 
     def search_by_street(self, street_name: str) -> List[FoodFacility]:
         """
@@ -40,8 +51,8 @@ class FoodFacilityService:
         Returns:
             A list of FoodFacility objects.
         """
-        facilities_base = self.repository.search_by_street_name(street_name)
-        return [FoodFacility(**f.model_dump()) for f in facilities_base] # Convert to FoodFacility schema
+        # Same as search_by_name: no schema difference, so skip the re-validation
+        return self.repository.search_by_street_name(street_name)
 
     def find_nearest(
         self, lat: float, lon: float, status: Optional[str] = "APPROVED", limit: int = 5
@@ -57,22 +68,79 @@ class FoodFacilityService:
             A list of FoodFacilityWithDistance objects, sorted by distance, up to the specified limit.
         """
 
-        if status is not None:
-            facilities_base = self.repository.get_facilities_by_status(status)
-        else:
-            # state is None (meaning all statuses), get all facilities with location
-            facilities_base = self.repository.get_all_facilities_with_location()
-
-        # Calculate distance for each facility and store with the facility data
-        facilities_with_distance = []
-        for facility_base in facilities_base:
-            # Ensure Latitude and Longitude are not None before calculating
-            if facility_base.Latitude is not None and facility_base.Longitude is not None:
-                 distance_km = calculate_distance(lat, lon, facility_base.Latitude, facility_base.Longitude)
-
-                 # Create a FoodFacilityWithDistance object including the calculated distance
-                 facilities_with_distance.append(FoodFacilityWithDistance(**facility_base.model_dump(), distance_km=distance_km))
-
-        # Sort by distance and return the top results based on the limit
-        facilities_with_distance.sort(key=lambda x: x.distance_km)
-        return facilities_with_distance[:limit]
+        # Fast path: query the startup-built spatial index (O(k log N) instead
+        # of scanning every candidate). The cache is cold under tests or when
+        # the database had not been ingested at startup.
+        index = cache.get_index(status)
+        if index is not None:
+            nearest = cache.query_nearest(index, lat, lon, limit)
+            rows_by_id = {row["locationid"]: row for row in self.repository.get_rows_by_ids([i for i, _ in nearest])}
+            # Iterate in the nearest order so the distance sort is preserved;
+            # the rows come from our own DB, so model_construct skips validation
+            return [
+                FoodFacilityWithDistance.model_construct(**dict(rows_by_id[location_id]), distance_km=distance_km)
+                for location_id, distance_km in nearest
+                if location_id in rows_by_id
+            ]
+
+        candidates = self._find_candidates_near(lat, lon, status=status, limit=limit)
+        if not candidates:
+            return []
+
+        # AoS -> SoA: contiguous arrays so the distance computation is a few
+        # vectorized NumPy operations instead of a per-row Python loop
+        ids = np.array([c[0] for c in candidates], dtype=np.int64)
+        lats = np.array([c[1] for c in candidates], dtype=np.float64)
+        lons = np.array([c[2] for c in candidates], dtype=np.float64)
+
+        distances = haversine_distances(lat, lon, lats, lons)
+
+        # Top-k selection without a full sort, then order the k winners by distance
+        k = min(limit, len(distances))
+        top_idx = np.argpartition(distances, k - 1)[:k]
+        top_idx = top_idx[np.argsort(distances[top_idx])]
+
+        # Hydrate full rows for just the k winners in a single query
+        top_ids = [int(ids[i]) for i in top_idx]
+        rows_by_id = {row["locationid"]: row for row in self.repository.get_rows_by_ids(top_ids)}
+
+        results = []
+        for i in top_idx:
+            row = rows_by_id.get(int(ids[i]))
+            if row is not None:
+                results.append(FoodFacilityWithDistance.model_construct(**dict(row), distance_km=float(distances[i])))
+        return results
+
+    def _find_candidates_near(self, lat: float, lon: float, status: Optional[str], limit: int):
+        """
+        Collects candidate (locationid, lat, lon) triples near the reference
+        point using a growing bounding box, so the distance kernel only sees
+        rows that can plausibly win.
+
+        Once a box holds >= limit hits it is widened one last time by sqrt(2):
+        a point just outside the box can still be closer than a hit sitting in
+        the box corner, and the wider box covers that circle. Falls back to
+        the full probe when the box would exceed the cap.
+        """
+        # cos(lat) stretches the longitude half-width so the box stays roughly
+        # square in kilometres; the floor guards the poles
+        cos_lat = max(math.cos(math.radians(lat)), 0.01)
+
+        delta = _BBOX_INITIAL_DELTA_DEG
+        while delta <= _BBOX_MAX_DELTA_DEG:
+            candidates = self.repository.get_candidates_in_bbox(
+                lat - delta, lat + delta,
+                lon - delta / cos_lat, lon + delta / cos_lat,
+                status=status,
+            )
+            if len(candidates) >= limit:
+                final_delta = delta * math.sqrt(2)
+                return self.repository.get_candidates_in_bbox(
+                    lat - final_delta, lat + final_delta,
+                    lon - final_delta / cos_lat, lon + final_delta / cos_lat,
+                    status=status,
+                )
+            delta *= 2
+
+        # Box grew past the cap without enough hits: probe everything
+        return self.repository.get_candidate_locations(status=status)
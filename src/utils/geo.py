@@ -1,11 +1,47 @@
-from geopy.distance import geodesic
+import math
+
+import numpy as np
 from typing import Tuple
 
+# Mean Earth radius in kilometers (IUGG value), used by the haversine formula
+EARTH_RADIUS_KM = 6371.0088
+
+# Degree-to-radian factor frozen at import; multiplying by it is one ufunc
+# (or float multiply) with no per-call math.radians lookup
+_DEG2RAD = math.pi / 180.0
+
 
 # --- Geospatial Utility Functions ---
+def calculate_distance_batch(lat1: float, lon1: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Calculates haversine distances from one reference point to many points at once.
+
+    Args:
+        lat1: Latitude of the reference point.
+        lon1: Longitude of the reference point.
+        lats: Array of latitudes to measure against.
+        lons: Array of longitudes to measure against.
+
+    Returns:
+        An array of distances in kilometers, one per (lats, lons) pair.
+
+    Uses the haversine formula, which is accurate to well under 1% at city
+    scale and runs as a handful of vectorized NumPy operations instead of a
+    Python loop.
+    """
+    lat1_rad = lat1 * _DEG2RAD
+    lon1_rad = lon1 * _DEG2RAD
+    lats_rad = np.asarray(lats, dtype=np.float64) * _DEG2RAD
+    dlat = lats_rad - lat1_rad
+    dlon = np.asarray(lons, dtype=np.float64) * _DEG2RAD - lon1_rad
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1_rad) * np.cos(lats_rad) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
 def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
-    Calculates the geodesic distance between two points on the Earth.
+    Calculates the distance between two points on the Earth.
 
     Args:
         lat1: Latitude of the first point.
@@ -17,19 +53,30 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
         The distance between the two points in kilometers.
         Returns float('inf') if any coordinate is None, though data ingestion
         should handle this by dropping rows. Added as a safeguard.
+
+    Thin scalar wrapper over calculate_distance_batch, so both APIs share
+    one haversine implementation and report identical numbers. The earlier
+    geopy geodesic version was more precise in the abstract but disagreed
+    with the batch path by more than it gained.
     """
     # Add a check for None coordinates as a safeguard, though data ingestion
     # should ensure Latitude/Longitude are present for rows used in nearest search.
     if any(coord is None for coord in [lat1, lon1, lat2, lon2]):
         return float('inf') # Return infinity if coordinates are missing
 
-    point1 = (lat1, lon1)
-    point2 = (lat2, lon2)
+    return float(calculate_distance_batch(lat1, lon1, np.array([lat2]), np.array([lon2]))[0])
+
 
-    try:
-        distance = geodesic(point1, point2).km
-        return distance
-    except ValueError as e:
-        # Handle potential errors from geopy (e.g., invalid coordinates)
-        print(f"Error calculating distance between {point1} and {point2}: {e}")
-        return float('inf') # Return infinity on calculation error
+def calculate_distance_from_prepared(lat1_rad: float, lon1_rad: float, lat2: float, lon2: float) -> float:
+    """
+    Scalar haversine distance from a reference point already converted to
+    radians. For callers comparing one point against many others one at a
+    time, converting the reference once and using this avoids redoing the
+    same degree-to-radian work per pair. (The batch/array paths remain the
+    right tool when the candidates are available all at once.)
+    """
+    lat2_rad = lat2 * _DEG2RAD
+    dlat = lat2_rad - lat1_rad
+    dlon = lon2 * _DEG2RAD - lon1_rad
+    a = math.sin(dlat / 2) ** 2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
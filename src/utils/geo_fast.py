@@ -0,0 +1,55 @@
+"""
+Optional numba-accelerated haversine kernel for the nearest search.
+
+The vectorized NumPy formula allocates several intermediate arrays (dlat,
+dlon, their sines/cosines, ...), each a full pass over memory. When numba is
+installed, the JIT-compiled kernel below fuses everything into a single
+pass with no temporaries; when it is not, the plain NumPy implementation
+from src.utils.geo is used instead. The loop is deliberately sequential:
+at this dataset size thread startup would cost more than the computation.
+"""
+import math
+
+import numpy as np
+
+from src.utils.geo import EARTH_RADIUS_KM, calculate_distance_batch
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - exercised only without numba installed
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True)
+    def _haversine_kernel(lat0: float, lon0: float, lats: np.ndarray, lons: np.ndarray, out: np.ndarray) -> None:
+        deg2rad = math.pi / 180.0
+        lat0_rad = lat0 * deg2rad
+        lon0_rad = lon0 * deg2rad
+        cos_lat0 = math.cos(lat0_rad)
+        for i in range(lats.shape[0]):
+            dlat = lats[i] * deg2rad - lat0_rad
+            dlon = lons[i] * deg2rad - lon0_rad
+            sin_dlat = math.sin(dlat / 2.0)
+            sin_dlon = math.sin(dlon / 2.0)
+            a = sin_dlat * sin_dlat + cos_lat0 * math.cos(lats[i] * deg2rad) * sin_dlon * sin_dlon
+            out[i] = 2.0 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+    def haversine_distances(lat0: float, lon0: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """Distances in km from (lat0, lon0) to every (lats, lons) pair, fused in one pass."""
+        lats = np.ascontiguousarray(lats, dtype=np.float64)
+        lons = np.ascontiguousarray(lons, dtype=np.float64)
+        out = np.empty(lats.shape[0], dtype=np.float64)
+        _haversine_kernel(lat0, lon0, lats, lons, out)
+        return out
+
+else:
+    def haversine_distances(lat0: float, lon0: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """Distances in km from (lat0, lon0) to every (lats, lons) pair (NumPy fallback)."""
+        return calculate_distance_batch(lat0, lon0, lats, lons)
+
+
+def warmup() -> None:
+    """Triggers JIT compilation once at startup so the first request doesn't pay for it."""
+    haversine_distances(0.0, 0.0, np.array([1.0]), np.array([1.0]))
@@ -1,38 +1,121 @@
+import orjson
 import pytest
 from fastapi.testclient import TestClient
-import sqlite3
 import os
+import sqlite3
 
 from src.main import app
+from src.core import cache
 from src.core.database import get_db
-from ingest_data import create_database_and_table, ingest_csv_data, CSV_FILE_PATH, TABLE_NAME
+from src.data_access.foodtruck_repository import (
+    FoodFacilityRepository,
+    _SQL_FTS_SEARCH,
+    _build_fts_match,
+)
+from src.services.foodtruck_service import FoodFacilityService
+from src.utils.geo import calculate_distance
+from ingest_data import create_database_and_table, ingest_csv_data, CSV_FILE_PATH
 
 # --- Test Setup ---
-TEST_DATABASE_FILE_PATH = "data/test_foodtrucks.db"
+# Shared-cache in-memory database: lives entirely in RAM (no file creation,
+# fsync, or teardown I/O per test) while still being addressable by URI so
+# additional connections could attach to the same database if needed. The
+# URI embeds the pytest-xdist worker id ("main" outside xdist) so each
+# worker seeds and owns its own database under `pytest -n auto`.
+_WORKER_ID = os.environ.get("PYTEST_XDIST_WORKER", "main")
+TEST_DATABASE_URI = f"file:test_foodtrucks_{_WORKER_ID}?mode=memory&cache=shared"
+
+@pytest.fixture(scope="session")
+def client():
+    """
+    One TestClient for the whole session, entered as a context manager so the
+    app's lifespan (startup hooks) runs exactly once instead of implicitly
+    per request. The startup hook may warm the spatial cache from the real
+    data/foodtrucks.db if present; it is cleared here so every endpoint reads
+    from the overridden test database.
+    """
+    with TestClient(app) as test_client:
+        cache.clear()
+        yield test_client
+
+def _json(response):
+    """Parses a response body with orjson (2-3x faster than the stdlib parser httpx uses)."""
+    return orjson.loads(response.content)
 
-client = TestClient(app)
+def _nearest(client, **params):
+    """Issues a /foodtrucks/nearest request with params bound by httpx (no URL formatting per call)."""
+    return client.get("/foodtrucks/nearest", params=params)
+
+def _statuses(data):
+    """Collects the distinct casefolded Status values from a response payload.
+
+    Building the set once and asserting `_statuses(data) <= {...}` walks the
+    rows a single time, instead of re-running a lower()-per-row generator for
+    every assertion.
+    """
+    return {item.get("Status", "").casefold() for item in data}
+
+def _apply_test_pragmas(conn: sqlite3.Connection):
+    """
+    Throwaway-database settings: no fsync, journal kept in memory, temp
+    objects in memory, and a 32 MiB page cache. Durability is irrelevant for
+    test databases, so this strips the bookkeeping SQLite does by default.
+    (The CSV ingest additionally applies its own bulk-load PRAGMAs and runs
+    as a single transaction.)
+    """
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA journal_mode=MEMORY")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-32768")
+
+@pytest.fixture(scope="session")
+def _seeded_db_template():
+    """
+    Builds the test database once per session: schema plus full CSV ingest
+    into the shared-cache in-memory database. The CSV is read-only for the
+    whole suite, so re-parsing and re-inserting it per test was pure
+    redundant work. Keeping this connection open holds the in-memory
+    database alive for the session.
+    """
+    print("\nSeeding session test database...")
+    conn = sqlite3.connect(TEST_DATABASE_URI, uri=True, check_same_thread=False)
+    _apply_test_pragmas(conn)
+    create_database_and_table(conn=conn)
+    ingest_csv_data(CSV_FILE_PATH, conn=conn)
+    yield conn
+    # Closing the last connection drops the in-memory database
+    conn.close()
+
+@pytest.fixture(scope="session")
+def _seeded_db_blob(_seeded_db_template):
+    """
+    Serialized byte image of the seeded database, snapshotted once per
+    session. Restoring it with Connection.deserialize() is a plain buffer
+    copy — no page-by-page backup loop, let alone a CSV re-ingest. None when
+    the running SQLite lacks serialize support, in which case the per-test
+    fixture falls back to backup().
+    """
+    if hasattr(_seeded_db_template, "serialize"):
+        return _seeded_db_template.serialize()
+    return None
 
-# Setup to create and destroy a test database for each test function
+# Per-test connection, seeded from the session template's serialized image
 @pytest.fixture(scope="function")
-def test_db_connection():
+def test_db_connection(_seeded_db_template, _seeded_db_blob):
     """
-    Provides a clean SQLite database connection for each test function.
-    Creates a temporary database file, ingests data into it,
-    overrides the get_db dependency to use this test database,
-    and yields the connection. The database file is deleted after the test finishes.
+    Provides each test with its own in-memory database, seeded by
+    deserializing the session blob (one memcpy-speed buffer assignment), or
+    by Connection.backup() where deserialize is unavailable. Either way each
+    test can mutate its database freely without affecting the others.
     """
-    print(f"\nSetting up test database at {TEST_DATABASE_FILE_PATH} at data/test_foodtrucks.db...")
-    # Ensure the data directory exists
-    os.makedirs('data', exist_ok=True)
-
-    # Create the database file and table structure in the test path
-    create_database_and_table(TEST_DATABASE_FILE_PATH)
-    # Ingest data from the source CSV into the test database table
-    ingest_csv_data(CSV_FILE_PATH, TEST_DATABASE_FILE_PATH, TABLE_NAME)
-
-    # Create a connection to the test database file
-    # check_same_thread=False is needed for SQLite with FastAPI/Uvicorn test client
-    conn = sqlite3.connect(TEST_DATABASE_FILE_PATH, check_same_thread=False)
+    # check_same_thread=False is required: TestClient executes sync endpoints
+    # on an anyio worker thread, not the thread that opened this connection
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    if _seeded_db_blob is not None:
+        conn.deserialize(_seeded_db_blob)
+    else:
+        _seeded_db_template.backup(conn)
+    _apply_test_pragmas(conn)
     # Set row_factory to access columns by name
     conn.row_factory = sqlite3.Row
 
@@ -45,73 +128,79 @@ def test_db_connection():
     yield conn
 
     # --- Teardown ---
-    print(f"Tearing down test database at data/test_foodtrucks.db...")
-    # Close the database connection
     conn.close()
-    # Delete the temporary test database file
-    if os.path.exists(TEST_DATABASE_FILE_PATH):
-        os.remove(TEST_DATABASE_FILE_PATH)
     # Clear the dependency override to restore the original behavior
     app.dependency_overrides.clear()
 
 # --- API Endpoint Tests ---
-def test_read_root():
+def test_read_root(client):
     """Test the root endpoint serving the static UI."""
     response = client.get("/")
     assert response.status_code == 200
     assert "text/html" in response.headers['content-type']
 
-
-def test_search_by_name_success(test_db_connection):
+    # StaticFiles tags the file with an ETag; a conditional re-request lets
+    # Starlette answer 304 from the file stat alone, skipping the body read.
+    # 200 stays acceptable in case a server stops emitting validators.
+    etag = response.headers.get("etag")
+    assert etag is not None
+    revalidated = client.get("/", headers={"If-None-Match": etag})
+    assert revalidated.status_code in (200, 304)
+
+
+# One case per query term: pytest reports each independently, and with the
+# session-seeded database every extra case costs only its own request.
+@pytest.mark.parametrize("q, must_match", [
+    ("food", None),           # common term
+    ("truck", None),          # should return multiple results
+    ("Curry", None),          # less certain term, case-insensitive
+    ("Curry Up Now", "Curry Up Now"),  # full applicant name, exact hit expected
+])
+def test_search_by_name_success(client, test_db_connection, q, must_match):
     """Test searching food facilities by applicant name (success cases)."""
-    # Use a common term that is likely to exist
-    response = client.get("/foodtrucks/search/name?q=food")
+    response = client.get("/foodtrucks/search/name", params={"q": q})
     assert response.status_code == 200
-    data = response.json()
+    data = _json(response)
     assert isinstance(data, list)
-    assert len(data) > 0 # Should return results for "food"
+    assert len(data) > 0
+    if must_match is not None:
+        assert any(item.get("Applicant") == must_match for item in data)
 
-    # Test with a term that should return multiple results if data exists
-    response = client.get("/foodtrucks/search/name?q=truck")
-    assert response.status_code == 200
-    data = response.json()
-    assert isinstance(data, list)
-    assert len(data) > 0 # Should return results for "truck"
 
-    # Test with a term that might be in the sample data but less certain
-    response = client.get("/foodtrucks/search/name?q=Curry")
-    assert response.status_code == 200
-    data = response.json()
-    assert isinstance(data, list)
-    assert len(data) > 0 # This was failing - might not be in dataset
+def test_search_by_name_uses_fts(test_db_connection):
+    """The name search should be answered by the FTS5 inverted index, not a table scan."""
+    match = _build_fts_match("food", "Applicant")
+    plan = test_db_connection.execute(f"EXPLAIN QUERY PLAN {_SQL_FTS_SEARCH}", [match]).fetchall()
+    plan_text = " ".join(row["detail"] for row in plan)
+    # The plan names the FTS table by its alias: the virtual table drives the
+    # query and the main table is only probed by rowid for the matches
+    assert "VIRTUAL TABLE" in plan_text
+    assert "USING INTEGER PRIMARY KEY" in plan_text
 
-    # Test with a full applicant name - less reliable without knowing the exact data
-    response = client.get("/foodtrucks/search/name?q=Curry Up Now")
-    assert response.status_code == 200
-    data = response.json()
-    assert isinstance(data, list)
-    assert len(data) > 0
-    assert any(item.get("Applicant") == "Curry Up Now" for item in data)
+    # And the FTS path really returns rows for a term the dataset contains,
+    # i.e. the endpoint is not silently falling back to LIKE
+    repository = FoodFacilityRepository(db=test_db_connection)
+    assert len(repository._search_fts("Applicant", "food")) > 0
 
 
-def test_search_by_name_no_results(test_db_connection):
+def test_search_by_name_no_results(client, test_db_connection):
     """Test searching by applicant name that should not exist."""
     response = client.get("/foodtrucks/search/name?q=nonexistenttruck12345")
     assert response.status_code == 200
-    data = response.json()
+    data = _json(response)
     assert isinstance(data, list)
     assert len(data) == 0 # Expect an empty list for no matches
 
-def test_search_by_name_with_status(test_db_connection):
+def test_search_by_name_with_status(client, test_db_connection):
     """Test searching by applicant name with status filter."""
     # Test with a common term and status ('APPROVED')
     response = client.get("/foodtrucks/search/name?q=food&status=approved")
     assert response.status_code == 200
-    data = response.json()
+    data = _json(response)
     assert isinstance(data, list)
     assert len(data) > 0 # Should return results for "food" and "approved"
     # Check if all returned items have the specified status (case-insensitive)
-    assert all(item.get("Status", "").lower() == "approved" for item in data)
+    assert _statuses(data) <= {"approved"}
     # Check if at least one result contains the applicant name
     assert any("food" in item.get("Applicant", "").lower() for item in data)
 
@@ -119,65 +208,47 @@ def test_search_by_name_with_status(test_db_connection):
     # Test with a common term and a status they might not have (should return empty or fewer)
     response = client.get("/foodtrucks/search/name?q=truck&status=expired")
     assert response.status_code == 200
-    data = response.json()
+    data = _json(response)
     assert isinstance(data, list)
     # We can't assert len > 0 here unless we know test data has expired trucks with "truck" in name
     # Let's just assert it's a list, and if results are returned, they have the right status
     if len(data) > 0:
-         assert all(item.get("Status", "").lower() == "expired" for item in data)
+         assert _statuses(data) <= {"expired"}
 
 
-def test_search_by_street_success(test_db_connection):
+# "avenue" and exact addresses like "3750 18TH ST" were tried here before and
+# returned nothing in this dataset, so the cases stick to terms known to exist.
+@pytest.mark.parametrize("q", [
+    "st",    # common street term
+    "blvd",  # slightly more specific, known to exist
+])
+def test_search_by_street_success(client, test_db_connection, q):
     """Test searching food facilities by street name (success cases)."""
-    # Use a common street term that is likely to exist
-    response = client.get("/foodtrucks/search/street?q=st")
+    response = client.get("/foodtrucks/search/street", params={"q": q})
     assert response.status_code == 200
-    data = response.json()
+    data = _json(response)
     assert isinstance(data, list)
-    assert len(data) > 0 # Should return results for "st"
-
-    # Test with a slightly more specific term that *is* likely to exist
-    # Based on the debug output, "avenue" returned 0, let's try something else common like "blvd" or "way"
-    response = client.get("/foodtrucks/search/street?q=blvd")
-    assert response.status_code == 200
-    data = response.json()
-    assert isinstance(data, list)
-    assert len(data) > 0 # Should return results for "blvd"
-
-    # Test with a term that might be in the sample data but less certain
-    # response = client.get("/foodtrucks/search/street?q=18th")
-    # assert response.status_code == 200
-    # data = response.json()
-    # assert isinstance(data, list)
-    # assert len(data) > 0 # This was failing - might not be in dataset
-
-    # Test with a full street name - less reliable without knowing the exact data
-    # response = client.get("/foodtrucks/search/street?q=3750 18TH ST")
-    # assert response.status_code == 200
-    # data = response.json()
-    # assert isinstance(data, list)
-    # assert len(data) > 0
-    # assert any(item.get("Address") == "3750 18TH ST" for item in data)
+    assert len(data) > 0
 
 
-def test_search_by_street_no_results(test_db_connection):
+def test_search_by_street_no_results(client, test_db_connection):
     """Test searching by street name that should not exist."""
     response = client.get("/foodtrucks/search/street?q=nonexistentstreet12345")
     assert response.status_code == 200
-    data = response.json()
+    data = _json(response)
     assert isinstance(data, list)
     assert len(data) == 0 # Expect an empty list for no matches
 
-def test_find_nearest_default_status(test_db_connection):
+def test_find_nearest_default_status(client, test_db_connection):
     """Test finding the nearest food facilities with default status (APPROVED)."""
     # Use coordinates near a known food truck with APPROVED status (e.g., The Geez Freeze)
     # Using coordinates from the sample data is the best bet here
     test_lat = 37.76201920035647
     test_lon = -122.42730642251331
 
-    response = client.get(f"/foodtrucks/nearest?lat={test_lat}&lon={test_lon}")
+    response = _nearest(client, lat=test_lat, lon=test_lon)
     assert response.status_code == 200
-    data = response.json()
+    data = _json(response)
     assert isinstance(data, list)
     assert len(data) <= 5 # Should return up to the default limit (5)
     assert len(data) > 0 # Assuming there are APPROVED trucks near these coordinates
@@ -187,25 +258,25 @@ def test_find_nearest_default_status(test_db_connection):
     assert all(distances[i] <= distances[i+1] for i in range(len(distances)-1))
 
     # Check if all returned items have the default status 'APPROVED' (case-insensitive)
-    assert all(item.get("Status", "").lower() == "approved" for item in data)
+    assert _statuses(data) <= {"approved"}
 
     # Check if distance_km is present in all results
     assert all("distance_km" in item for item in data)
 
 
-def test_find_nearest_with_specific_status(test_db_connection):
+def test_find_nearest_with_specific_status(client, test_db_connection):
     """Test finding the nearest food facilities with a specific status."""
     # Use coordinates from the sample data
     test_lat = 37.76201920035647
     test_lon = -122.42730642251331
 
     # Test with 'APPROVED' status explicitly
-    response = client.get(f"/foodtrucks/nearest?lat={test_lat}&lon={test_lon}&status=approved")
+    response = _nearest(client, lat=test_lat, lon=test_lon, status="approved")
     assert response.status_code == 200
-    data = response.json()
+    data = _json(response)
     assert isinstance(data, list)
     assert len(data) <= 5
-    assert all(item.get("Status", "").lower() == "approved" for item in data)
+    assert _statuses(data) <= {"approved"}
     if len(data) > 1:
          # Check sorting if more than one result
          distances = [item.get("distance_km", float('inf')) for item in data]
@@ -216,29 +287,29 @@ def test_find_nearest_with_specific_status(test_db_connection):
     # This requires knowing if your test data has trucks with these statuses near the coordinates.
     # Based on the debug output, there *are* expired trucks, and 5 were returned.
     # We should assert that if results are returned, they have the correct status.
-    response_expired = client.get(f"/foodtrucks/nearest?lat={test_lat}&lon={test_lon}&status=expired")
+    response_expired = _nearest(client, lat=test_lat, lon=test_lon, status="expired")
     assert response_expired.status_code == 200
-    data_expired = response_expired.json()
+    data_expired = _json(response_expired)
     assert isinstance(data_expired, list)
     # Remove the incorrect assertion that length should be 0
     # assert len(data_expired) == 0
     # Instead, assert that if results are returned, they have the correct status
     if len(data_expired) > 0:
-        assert all(item.get("Status", "").lower() == "expired" for item in data_expired)
+        assert _statuses(data_expired) <= {"expired"}
         # Optional: Check if the number of results is as expected if you know the data
         # assert len(data_expired) == 5 # Based on previous run
 
 
-def test_find_nearest_all_statuses(test_db_connection):
+def test_find_nearest_all_statuses(client, test_db_connection):
     """Test finding the nearest food facilities with status='all'."""
     # Use coordinates from the sample data
     test_lat = 37.76201920035647
     test_lon = -122.42730642251331
 
     # Test with status='all' string input
-    response = client.get(f"/foodtrucks/nearest?lat={test_lat}&lon={test_lon}&status=all")
+    response = _nearest(client, lat=test_lat, lon=test_lon, status="all")
     assert response.status_code == 200
-    data = response.json()
+    data = _json(response)
     assert isinstance(data, list)
     assert len(data) <= 5
 
@@ -252,55 +323,79 @@ def test_find_nearest_all_statuses(test_db_connection):
     assert all(distances[i] <= distances[i+1] for i in range(len(distances)-1))
 
 
-def test_find_nearest_limit_override(test_db_connection):
+def test_find_nearest_limit_override(client, test_db_connection):
     """Test finding the nearest food facilities with a different limit."""
     # Use coordinates from the sample data
     test_lat = 37.76201920035647
     test_lon = -122.42730642251331
     test_limit = 3 # Request only 3 nearest
 
-    response = client.get(f"/foodtrucks/nearest?lat={test_lat}&lon={test_lon}&limit={test_limit}")
+    response = _nearest(client, lat=test_lat, lon=test_lon, limit=test_limit)
     assert response.status_code == 200
-    data = response.json()
+    data = _json(response)
     assert isinstance(data, list)
     assert len(data) <= test_limit # Should return up to the specified limit (3)
     if len(data) > 0:
         # Check default status filter is still applied when limit is overridden
-        assert all(item.get("Status", "").lower() == "approved" for item in data)
+        assert _statuses(data) <= {"approved"}
         if len(data) > 1:
              # Check sorting if more than one result
              distances = [item.get("distance_km", float('inf')) for item in data]
              assert all(distances[i] <= distances[i+1] for i in range(len(distances)-1))
 
 
-def test_find_nearest_invalid_input():
+def test_nearest_bbox_prefilter_matches_full_scan(test_db_connection):
+    """The bounding-box candidate pruning must not change which facilities win."""
+    service = FoodFacilityService(repository=FoodFacilityRepository(db=test_db_connection))
+    lat, lon = 37.76201920035647, -122.42730642251331
+    limit = 5
+
+    # The pruned candidate set is a subset of the full probe with enough hits
+    pruned = service._find_candidates_near(lat, lon, status="approved", limit=limit)
+    full = service.repository.get_candidate_locations(status="approved")
+    assert limit <= len(pruned) <= len(full)
+    assert set(pruned) <= set(full)
+
+    # End to end: the winners must be exactly the nearest rows of a brute-force
+    # scan over every candidate (a latency assertion here would be flaky; the
+    # pruning is worthless if it changes the answer, so that is what we pin)
+    expected_ids = [
+        location_id
+        for _, location_id in sorted(
+            (calculate_distance(lat, lon, c_lat, c_lon), location_id)
+            for location_id, c_lat, c_lon in full
+        )[:limit]
+    ]
+    results = service.find_nearest(lat, lon, status="approved", limit=limit)
+    assert [r.locationid for r in results] == expected_ids
+
+
+def test_find_nearest_invalid_input(client):
     """Test finding the nearest food facilities with invalid input (FastAPI validation)."""
     
+    # Each sub-case deserializes the body once and scans the detail list once,
+    # collecting messages and (type, loc) pairs into sets to assert against.
+
     # Test with non-numeric latitude
-    response = client.get("/foodtrucks/nearest?lat=abc&lon=-122.4")
+    response = _nearest(client, lat="abc", lon=-122.4)
     assert response.status_code == 422 # Expect FastAPI's validation error (Unprocessable Entity)
-    assert "detail" in response.json()
-    error_messages = [err.get("msg", "").lower() for err in response.json().get("detail", [])]
-    assert any("value is not a valid float" in msg or "input should be a valid number" in msg for msg in error_messages)
-
+    details = _json(response).get("detail", [])
+    msgs = {err.get("msg", "").lower() for err in details}
+    assert any("value is not a valid float" in msg or "input should be a valid number" in msg for msg in msgs)
 
     # Test with missing longitude
-    response = client.get("/foodtrucks/nearest?lat=37.7")
+    response = _nearest(client, lat=37.7)
     assert response.status_code == 422 # Expect FastAPI's validation error
-    assert "detail" in response.json()
-    assert any("field required" in err.get("msg", "").lower() and err.get("loc", []) == ["query", "lon"] for err in response.json().get("detail", []))
-
+    details = _json(response).get("detail", [])
+    msg_locs = {(err.get("msg", "").lower(), tuple(err.get("loc", []))) for err in details}
+    assert any(msg == "field required" and loc == ("query", "lon") for msg, loc in msg_locs)
 
     # Test with limit less than 1 (due to ge=1 validation in API)
-    response = client.get("/foodtrucks/nearest?lat=37.7&lon=-122.4&limit=0")
+    response = _nearest(client, lat=37.7, lon=-122.4, limit=0)
     assert response.status_code == 422 # Expect FastAPI's validation error
-    assert "detail" in response.json()
     # Based on common FastAPI/Pydantic errors for `ge=1` validation:
-    # The error detail should contain a 'type' field indicating the validation failure
-    # and a 'loc' field indicating the location of the error.
-    error_details = response.json().get("detail", [])
-    assert any(
-        err.get("type") == "greater_than_equal" and err.get("loc", []) == ["query", "limit"]
-        for err in error_details
-    )
+    # the detail should carry the failure type and the location of the error
+    details = _json(response).get("detail", [])
+    types_locs = {(err.get("type"), tuple(err.get("loc", []))) for err in details}
+    assert ("greater_than_equal", ("query", "limit")) in types_locs
 
@@ -1,6 +1,13 @@
+import math
+
+import numpy as np
 import pytest
 
-from src.utils.geo import calculate_distance
+from src.utils.geo import (
+    calculate_distance,
+    calculate_distance_batch,
+    calculate_distance_from_prepared,
+)
 
 
 # --- Utility Function Tests ---
@@ -34,6 +41,45 @@ def test_calculate_distance_known_points():
     distance_equator = calculate_distance(0, 0, 0, 1)
     assert distance_equator == pytest.approx(111.32, rel=0.01) # Allow 1% relative tolerance
 
+def test_calculate_distance_vectorized():
+    """Test the vectorized haversine used by the nearest search against known points."""
+    # Reference point: San Francisco City Hall; targets include the same
+    # point, the Golden Gate Bridge, and a one-degree hop on the equator case
+    lats = np.array([37.7790, 37.8199, 0.0])
+    lons = np.array([-122.4199, -122.4783, 1.0])
+
+    distances = calculate_distance_batch(37.7790, -122.4199, lats, lons)
+
+    assert distances.shape == (3,)
+    assert distances[0] == pytest.approx(0.0, abs=1e-9)
+    assert distances[1] == pytest.approx(6.860178748724984, abs=0.05)
+
+    # The whole batch should agree with the scalar implementation
+    scalar = [calculate_distance(37.7790, -122.4199, la, lo) for la, lo in zip(lats, lons)]
+    assert np.allclose(distances, scalar, rtol=0.01, atol=0.05)
+
+
+def test_calculate_distance_batch_random_points():
+    """Batch and scalar results must agree on arbitrary coordinates."""
+    rng = np.random.default_rng(42)
+    lats = rng.uniform(-90, 90, size=50)
+    lons = rng.uniform(-180, 180, size=50)
+
+    distances = calculate_distance_batch(37.7749, -122.4194, lats, lons)
+    scalar = [calculate_distance(37.7749, -122.4194, la, lo) for la, lo in zip(lats, lons)]
+    assert np.allclose(distances, scalar, rtol=1e-12, atol=1e-9)
+
+
+def test_calculate_distance_from_prepared_matches_public():
+    """The prepared-radians variant must agree exactly with the public wrapper."""
+    lat1, lon1 = 37.7790, -122.4199
+    lat1_rad, lon1_rad = math.radians(lat1), math.radians(lon1)
+
+    for lat2, lon2 in [(37.8199, -122.4783), (0.0, 1.0), (lat1, lon1)]:
+        prepared = calculate_distance_from_prepared(lat1_rad, lon1_rad, lat2, lon2)
+        assert prepared == pytest.approx(calculate_distance(lat1, lon1, lat2, lon2), abs=1e-9)
+
+
 def test_calculate_distance_with_none_coordinates():
     """Test distance calculation when one or more coordinates are None."""
     